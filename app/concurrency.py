@@ -0,0 +1,140 @@
+import asyncio
+import re
+from dataclasses import dataclass, field
+
+from fastapi import APIRouter
+from starlette.responses import JSONResponse
+
+from app.database import settings
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+# (method, path pattern, route class); first match wins, unmatched requests are not limited
+ROUTE_CLASSES = [
+    ("POST", re.compile(r"^/events/\d+/tapin$"), "hot"),
+    ("POST", re.compile(r"^/events/\d+/grade(/aspects)?$"), "hot"),
+    ("POST", re.compile(r"^/members/[^/]+/points/(add|redeem)$"), "hot"),
+    ("GET", re.compile(r"^/members$"), "heavy"),
+    ("GET", re.compile(r"^/events/\d+/members$"), "heavy"),
+    ("GET", re.compile(r"^/events$"), "heavy"),
+]
+
+
+@dataclass
+class ClassLimiter:
+    """Concurrency cap for one route class with a bounded, time-limited wait queue."""
+    name: str
+    max_concurrent: int
+    max_queue: int
+    queue_timeout: float
+    active: int = 0
+    waiting: int = 0
+    admitted: int = 0
+    shed_queue_full: int = 0
+    shed_timeout: int = 0
+    _slots: asyncio.Semaphore = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+
+    async def acquire(self) -> bool:
+        # judge saturation by the semaphore itself; a free slot is taken without suspending,
+        # so requests arriving in the same loop iteration can't all slip past the queue bound
+        if not self._slots.locked():
+            await self._slots.acquire()
+        else:
+            if self.waiting >= self.max_queue:
+                self.shed_queue_full += 1
+                return False
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.shed_timeout += 1
+                return False
+            finally:
+                self.waiting -= 1
+        self.active += 1
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "maxConcurrent": self.max_concurrent,
+            "maxQueue": self.max_queue,
+            "queueTimeout": self.queue_timeout,
+            "active": self.active,
+            "queueDepth": self.waiting,
+            "admitted": self.admitted,
+            "shedQueueFull": self.shed_queue_full,
+            "shedTimeout": self.shed_timeout,
+        }
+
+
+limiters: dict[str, ClassLimiter] = {
+    "hot": ClassLimiter(
+        name="hot",
+        max_concurrent=settings.HOT_MAX_CONCURRENT,
+        max_queue=settings.HOT_MAX_QUEUE,
+        queue_timeout=settings.HOT_QUEUE_TIMEOUT,
+    ),
+    "heavy": ClassLimiter(
+        name="heavy",
+        max_concurrent=settings.HEAVY_MAX_CONCURRENT,
+        max_queue=settings.HEAVY_MAX_QUEUE,
+        queue_timeout=settings.HEAVY_QUEUE_TIMEOUT,
+    ),
+}
+
+
+def classify(method: str, path: str) -> str | None:
+    for route_method, pattern, route_class in ROUTE_CLASSES:
+        if method == route_method and pattern.match(path):
+            return route_class
+    return None
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    Caps in-flight requests per route class so heavy reads can't starve tap-in.
+    When a class is saturated the request gets a fast 503 with Retry-After.
+    """
+
+    def __init__(self, app, limiters: dict[str, ClassLimiter] = limiters):
+        self.app = app
+        self.limiters = limiters
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route_class = classify(scope["method"], scope["path"])
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiters[route_class]
+        if not await limiter.acquire():
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": f"Server busy ({route_class} requests), please retry"},
+                headers={"Retry-After": str(settings.SHED_RETRY_AFTER)},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+
+# async so it stays answerable while the threadpool is saturated
+@router.get("/concurrency")
+async def concurrency_stats():
+    return {name: limiter.stats() for name, limiter in limiters.items()}
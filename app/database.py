@@ -7,6 +7,20 @@ from pydantic import AnyHttpUrl
 class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite:///./app.db"
     CORS_ORIGINS: List[AnyHttpUrl] | List[str] = []
+    IDEMPOTENCY_MAX_ENTRIES: int = 1024
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 60 * 60
+    IDEMPOTENCY_PERSIST: bool = False   # also keep responses in the idempotencyrecord table
+    IDEMPOTENCY_WAIT_TIMEOUT: float = 30.0
+    # per-route-class concurrency limits (hot = tap-in/grade/points, heavy = full list reads);
+    # HOT + HEAVY stay below the engine's 15 connections (pool 5 + overflow 10) so a saturated
+    # class is shed instead of blocking on the pool, leaving room for unlimited routes
+    HOT_MAX_CONCURRENT: int = 8
+    HOT_MAX_QUEUE: int = 64
+    HOT_QUEUE_TIMEOUT: float = 5.0
+    HEAVY_MAX_CONCURRENT: int = 2
+    HEAVY_MAX_QUEUE: int = 4
+    HEAVY_QUEUE_TIMEOUT: float = 2.0
+    SHED_RETRY_AFTER: int = 2
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=False)
 
 settings = Settings()
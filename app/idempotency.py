@@ -0,0 +1,247 @@
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from sqlmodel import Session, delete
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+from app.database import engine, settings
+from app.models import IdempotencyRecord
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+
+# write endpoints that scanner devices retry on flaky connections
+IDEMPOTENT_ROUTES = [
+    re.compile(r"^/events/\d+/tapin$"),
+    re.compile(r"^/events/\d+/grade$"),
+    re.compile(r"^/events/\d+/grade/aspects$"),
+    re.compile(r"^/members/[^/]+/points/add$"),
+    re.compile(r"^/members/[^/]+/points/redeem$"),
+]
+
+
+@dataclass
+class StoredResponse:
+    fingerprint: str
+    status_code: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+    created_at: float = field(default_factory=time.time)
+
+
+class IdempotencyStore:
+    """
+    Bounded LRU of first responses keyed by Idempotency-Key.
+    Optionally mirrored to the idempotencyrecord table so replays survive restarts.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, persist: bool = False):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist = persist
+        self._entries: OrderedDict[str, StoredResponse] = OrderedDict()
+        self._in_flight: dict[str, asyncio.Event] = {}
+
+    def _expired(self, entry: StoredResponse) -> bool:
+        return time.time() - entry.created_at > self.ttl_seconds
+
+    def _remember(self, key: str, entry: StoredResponse) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> StoredResponse | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if self._expired(entry):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+        if not self.persist:
+            return None
+        entry = await run_in_threadpool(self._load, key)
+        if entry is not None and not self._expired(entry):
+            self._remember(key, entry)
+            return entry
+        return None
+
+    async def put(self, key: str, entry: StoredResponse) -> None:
+        self._remember(key, entry)
+        if self.persist:
+            # the response is already sent and cached in memory; a failed save must not surface as an app error
+            try:
+                await run_in_threadpool(self._save, key, entry)
+            except Exception:
+                logger.exception("Failed to persist idempotency record %s", key)
+
+    def claim(self, key: str) -> asyncio.Event | None:
+        """Mark key as in flight. Returns the existing event to wait on if someone else holds it."""
+        if key in self._in_flight:
+            return self._in_flight[key]
+        self._in_flight[key] = asyncio.Event()
+        return None
+
+    def release(self, key: str) -> None:
+        event = self._in_flight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def _load(self, key: str) -> StoredResponse | None:
+        with Session(engine) as db:
+            row = db.get(IdempotencyRecord, key)
+            if not row:
+                return None
+            return StoredResponse(
+                fingerprint=row.fingerprint,
+                status_code=row.status_code,
+                headers=[(b"content-type", row.content_type.encode("latin-1"))],
+                body=row.body,
+                created_at=row.created_at,
+            )
+
+    def _save(self, key: str, entry: StoredResponse) -> None:
+        content_type = next(
+            (v.decode("latin-1") for k, v in entry.headers if k.lower() == b"content-type"),
+            "application/json",
+        )
+        with Session(engine) as db:
+            db.merge(IdempotencyRecord(
+                key=key,
+                fingerprint=entry.fingerprint,
+                status_code=entry.status_code,
+                content_type=content_type,
+                body=entry.body,
+                created_at=entry.created_at,
+            ))
+            # purge expired rows on write so the table stays bounded by the TTL
+            db.exec(delete(IdempotencyRecord).where(
+                IdempotencyRecord.created_at < time.time() - self.ttl_seconds
+            ))
+            db.commit()
+
+
+idempotency_store = IdempotencyStore(
+    max_entries=settings.IDEMPOTENCY_MAX_ENTRIES,
+    ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+    persist=settings.IDEMPOTENCY_PERSIST,
+)
+
+
+def _is_idempotent_route(method: str, path: str) -> bool:
+    return method == "POST" and any(r.match(path) for r in IDEMPOTENT_ROUTES)
+
+
+def _replay(entry: StoredResponse):
+    headers = [(k, v) for k, v in entry.headers if k.lower() != b"content-length"]
+    headers.append((b"content-length", str(len(entry.body)).encode("latin-1")))
+    headers.append((b"idempotent-replayed", b"true"))
+
+    async def send_replay(send):
+        await send({"type": "http.response.start", "status": entry.status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": entry.body})
+
+    return send_replay
+
+
+class IdempotencyMiddleware:
+    """
+    Answers retried writes carrying an Idempotency-Key from the stored first response,
+    so the handler (and its member/event lookups) never runs twice for the same key.
+    Requests racing on the same key wait for the first one to finish.
+    """
+
+    def __init__(self, app, store: IdempotencyStore = idempotency_store):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _is_idempotent_route(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        raw_key = dict(scope["headers"]).get(IDEMPOTENCY_HEADER)
+        if not raw_key:
+            await self.app(scope, receive, send)
+            return
+
+        # scope the key to the route so one key can't replay another endpoint's response
+        key = f"{scope['path']}:{raw_key.decode('latin-1')}"
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            # client dropped mid-upload: don't run (or store) anything under this key
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+        fingerprint = hashlib.sha256(body).hexdigest()
+
+        # claim the key before looking it up, so only the holder can decide the handler must run
+        while True:
+            pending = self.store.claim(key)
+            if pending is None:
+                break
+            try:
+                await asyncio.wait_for(pending.wait(), timeout=settings.IDEMPOTENCY_WAIT_TIMEOUT)
+            except asyncio.TimeoutError:
+                response = JSONResponse(
+                    status_code=409,
+                    content={"detail": "A request with this Idempotency-Key is still in progress"},
+                )
+                await response(scope, receive, send)
+                return
+
+        try:
+            entry = await self.store.get(key)
+            if entry is not None:
+                if entry.fingerprint != fingerprint:
+                    response = JSONResponse(
+                        status_code=422,
+                        content={"detail": "Idempotency-Key was already used with a different request body"},
+                    )
+                    await response(scope, receive, send)
+                    return
+                await _replay(entry)(send)
+                return
+
+            body_sent = False
+
+            async def replay_receive():
+                nonlocal body_sent
+                if not body_sent:
+                    body_sent = True
+                    return {"type": "http.request", "body": body, "more_body": False}
+                return await receive()
+
+            captured: dict = {"status": None, "headers": [], "body": b""}
+
+            async def capture_send(message):
+                if message["type"] == "http.response.start":
+                    captured["status"] = message["status"]
+                    captured["headers"] = list(message.get("headers", []))
+                elif message["type"] == "http.response.body":
+                    captured["body"] += message.get("body", b"")
+                await send(message)
+
+            await self.app(scope, replay_receive, capture_send)
+            # server errors are not stored so a retry gets a fresh attempt
+            if captured["status"] is not None and captured["status"] < 500:
+                await self.store.put(key, StoredResponse(
+                    fingerprint=fingerprint,
+                    status_code=captured["status"],
+                    headers=captured["headers"],
+                    body=captured["body"],
+                ))
+        finally:
+            self.store.release(key)
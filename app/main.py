@@ -5,7 +5,9 @@ from fastapi.responses import RedirectResponse
 from typing import List
 from sqlmodel import Session, select
 from app.database import init_db, settings, get_db
-from app import pin_routes
+from app import pin_routes, concurrency
+from app.concurrency import ConcurrencyLimitMiddleware
+from app.idempotency import IdempotencyMiddleware
 from app.models import Event, Member, EventMemberLink
 from app.pin_routes import must_get_valid_pin
 from app.schemas import (
@@ -18,7 +20,12 @@ from app.deps import get_db, must_get_event, must_get_member
 
 app = FastAPI(title="Events & Members API (SQLite)")
 app.include_router(pin_routes.router)
+app.include_router(concurrency.router)
 
+# cap hot writes vs heavy reads separately; added first so idempotent replays skip it
+app.add_middleware(ConcurrencyLimitMiddleware)
+# replay retried writes that carry an Idempotency-Key (tap-in, grading, points)
+app.add_middleware(IdempotencyMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS or ["*"],
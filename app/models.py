@@ -45,4 +45,12 @@ class Member(SQLModel, table=True):
 class Pin(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
     name: str = Field(index=True)
-    pin: str = Field(max_length=4, index=True)
\ No newline at end of file
+    pin: str = Field(max_length=4, index=True)
+
+class IdempotencyRecord(SQLModel, table=True):
+    key: str = Field(primary_key=True)
+    fingerprint: str                    # sha256 of the request body
+    status_code: int
+    content_type: str = "application/json"
+    body: bytes
+    created_at: float = Field(index=True)   # unix timestamp, rows past the TTL are purged on write
@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# point the app at a throwaway database before app.database reads its settings
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
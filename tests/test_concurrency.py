@@ -0,0 +1,115 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.responses import JSONResponse
+
+from app.concurrency import ClassLimiter, ConcurrencyLimitMiddleware, classify
+from app.database import settings
+from app.main import app
+
+
+def make_client(asgi_app=app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi_app), base_url="http://test")
+
+
+@pytest.mark.parametrize("method, path, expected", [
+    ("POST", "/events/1/tapin", "hot"),
+    ("POST", "/events/1/grade", "hot"),
+    ("POST", "/events/1/grade/aspects", "hot"),
+    ("POST", "/members/abc/points/add", "hot"),
+    ("POST", "/members/abc/points/redeem", "hot"),
+    ("GET", "/members", "heavy"),
+    ("GET", "/events", "heavy"),
+    ("GET", "/events/1/members", "heavy"),
+    ("GET", "/members/abc", None),
+    ("POST", "/members", None),
+    ("GET", "/events/1/tapin", None),
+])
+def test_classify(method, path, expected):
+    assert classify(method, path) == expected
+
+
+async def hold(limiter: ClassLimiter, seconds: float) -> bool:
+    admitted = await limiter.acquire()
+    if admitted:
+        await asyncio.sleep(seconds)
+        limiter.release()
+    return admitted
+
+
+def test_burst_beyond_queue_is_shed_immediately():
+    async def scenario():
+        limiter = ClassLimiter("x", max_concurrent=1, max_queue=1, queue_timeout=5.0)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        results = await asyncio.gather(*[hold(limiter, 0.05) for _ in range(50)])
+        return limiter, results, loop.time() - started
+
+    limiter, results, elapsed = asyncio.run(scenario())
+
+    assert sum(results) == 2
+    assert limiter.stats()["shedQueueFull"] == 48
+    assert limiter.stats()["shedTimeout"] == 0
+    assert elapsed < 1.0
+
+
+def test_queued_request_is_shed_after_timeout():
+    async def scenario():
+        limiter = ClassLimiter("x", max_concurrent=1, max_queue=4, queue_timeout=0.05)
+        holder = asyncio.create_task(hold(limiter, 0.5))
+        await asyncio.sleep(0)
+        queued = await limiter.acquire()
+        await holder
+        return limiter, queued
+
+    limiter, queued = asyncio.run(scenario())
+
+    assert queued is False
+    assert limiter.stats()["shedTimeout"] == 1
+    assert limiter.stats()["queueDepth"] == 0
+    assert limiter.stats()["active"] == 0
+
+
+def test_saturated_class_returns_503_with_retry_after():
+    async def slow_app(scope, receive, send):
+        await asyncio.sleep(0.2)
+        await JSONResponse({"ok": True})(scope, receive, send)
+
+    async def scenario():
+        limiters = {
+            "hot": ClassLimiter("hot", max_concurrent=1, max_queue=0, queue_timeout=1.0),
+            "heavy": ClassLimiter("heavy", max_concurrent=1, max_queue=1, queue_timeout=1.0),
+        }
+        middleware = ConcurrencyLimitMiddleware(slow_app, limiters=limiters)
+        async with make_client(middleware) as client:
+            responses = await asyncio.gather(*[client.get("/members") for _ in range(4)])
+            unclassified = await client.get("/members/abc")
+        return limiters, responses, unclassified
+
+    limiters, responses, unclassified = asyncio.run(scenario())
+
+    statuses = sorted(r.status_code for r in responses)
+    assert statuses == [200, 200, 503, 503]
+    shed = [r for r in responses if r.status_code == 503]
+    assert all(r.headers["retry-after"] == str(settings.SHED_RETRY_AFTER) for r in shed)
+    assert limiters["heavy"].stats()["shedQueueFull"] == 2
+    assert limiters["hot"].stats()["admitted"] == 0
+    assert unclassified.status_code == 200
+
+
+def test_stats_endpoint_reports_each_class():
+    async def scenario():
+        async with make_client() as client:
+            return await client.get("/stats/concurrency")
+
+    r = asyncio.run(scenario())
+
+    assert r.status_code == 200
+    body = r.json()
+    assert set(body) == {"hot", "heavy"}
+    assert set(body["hot"]) == {
+        "maxConcurrent", "maxQueue", "queueTimeout", "active",
+        "queueDepth", "admitted", "shedQueueFull", "shedTimeout",
+    }
+    assert body["heavy"]["maxConcurrent"] == settings.HEAVY_MAX_CONCURRENT
@@ -0,0 +1,133 @@
+import asyncio
+import uuid
+
+import httpx
+import pytest
+from starlette.responses import JSONResponse
+
+from app.idempotency import IdempotencyMiddleware, IdempotencyStore, idempotency_store
+from app.main import app
+
+
+@pytest.fixture(autouse=True)
+def clear_store():
+    idempotency_store._entries.clear()
+    idempotency_store._in_flight.clear()
+    yield
+    idempotency_store.persist = False
+
+
+def make_client(asgi_app=app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi_app), base_url="http://test")
+
+
+async def create_member(client: httpx.AsyncClient) -> str:
+    card_id = uuid.uuid4().hex[:8]
+    r = await client.post("/members", json={"cardId": card_id, "name": "Test", "age": None, "status": None})
+    assert r.status_code == 201
+    return card_id
+
+
+@pytest.mark.parametrize("persist", [False, True])
+def test_concurrent_requests_with_one_key_credit_once(persist):
+    idempotency_store.persist = persist
+
+    async def scenario():
+        async with make_client() as client:
+            card_id = await create_member(client)
+            headers = {"Idempotency-Key": "retry-1"}
+            responses = await asyncio.gather(*[
+                client.post(f"/members/{card_id}/points/add", json={"amount": 5}, headers=headers)
+                for _ in range(5)
+            ])
+            member = await client.get(f"/members/{card_id}")
+            return responses, member.json()
+
+    responses, member = asyncio.run(scenario())
+
+    assert [r.status_code for r in responses] == [200] * 5
+    assert all(r.json()["balance"] == 5 for r in responses)
+    assert sum(r.headers.get("idempotent-replayed") == "true" for r in responses) == 4
+    assert member["points"] == 5
+
+
+def test_reused_key_with_different_body_is_rejected():
+    async def scenario():
+        async with make_client() as client:
+            card_id = await create_member(client)
+            headers = {"Idempotency-Key": "retry-2"}
+            first = await client.post(f"/members/{card_id}/points/add", json={"amount": 5}, headers=headers)
+            second = await client.post(f"/members/{card_id}/points/add", json={"amount": 7}, headers=headers)
+            member = await client.get(f"/members/{card_id}")
+            return first, second, member.json()
+
+    first, second, member = asyncio.run(scenario())
+
+    assert first.status_code == 200
+    assert second.status_code == 422
+    assert member["points"] == 5
+
+
+def test_server_error_is_not_replayed():
+    calls = []
+
+    async def flaky_app(scope, receive, send):
+        calls.append(scope["path"])
+        status_code = 500 if len(calls) == 1 else 200
+        await JSONResponse({"attempt": len(calls)}, status_code=status_code)(scope, receive, send)
+
+    middleware = IdempotencyMiddleware(flaky_app, store=IdempotencyStore(max_entries=8, ttl_seconds=60))
+
+    async def scenario():
+        async with make_client(middleware) as client:
+            headers = {"Idempotency-Key": "retry-3"}
+            return [
+                await client.post("/members/abc/points/add", json={"amount": 1}, headers=headers)
+                for _ in range(3)
+            ]
+
+    first, second, third = asyncio.run(scenario())
+
+    assert first.status_code == 500
+    assert second.status_code == 200
+    assert "idempotent-replayed" not in second.headers
+    assert third.json() == {"attempt": 2}
+    assert third.headers["idempotent-replayed"] == "true"
+    assert len(calls) == 2
+
+
+def test_disconnect_while_reading_body_does_not_claim_key():
+    calls = []
+
+    async def echo_app(scope, receive, send):
+        calls.append(scope["path"])
+        await JSONResponse({"attempt": len(calls)})(scope, receive, send)
+
+    store = IdempotencyStore(max_entries=8, ttl_seconds=60)
+    middleware = IdempotencyMiddleware(echo_app, store=store)
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/members/c1/points/add",
+        "headers": [(b"idempotency-key", b"k1")],
+    }
+
+    async def dropped_receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        raise AssertionError("nothing should be sent to a disconnected client")
+
+    async def scenario():
+        await middleware(scope, dropped_receive, send)
+        async with make_client(middleware) as client:
+            return await client.post(
+                "/members/c1/points/add", json={"amount": 5}, headers={"Idempotency-Key": "k1"}
+            )
+
+    retry = asyncio.run(scenario())
+
+    assert retry.status_code == 200
+    assert "idempotent-replayed" not in retry.headers
+    assert retry.json() == {"attempt": 1}
+    assert calls == ["/members/c1/points/add"]